@@ -5,119 +5,213 @@ load_dotenv()
 
 import os
 import time
-import uuid
+import secrets
+import queue
+import hashlib
+import hmac
+import threading
+import atexit
 import logging
+import logging.handlers
+import orjson
+from collections import defaultdict
 from datetime import datetime
-from flask import Flask, jsonify, request, g
+from functools import lru_cache
+from flask import Flask, Response, abort, jsonify, request, g, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from cachetools import TTLCache
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
 from werkzeug.exceptions import HTTPException
 from rag.rag import answer as rag_answer
-from rag.rag import _get_retriever as get_retriever
+from rag.rag import answer_stream as rag_answer_stream
+from rag.rag import get_retriever, strip_text
 
 
 # LOGGING SETUP - Structured logging with JSON format
+# Request threads only enqueue records; a background listener thread does the file/console I/O.
+# This relies on real OS threads (the gthread workers in gunicorn.conf.py). Under gevent
+# monkey-patching the listener becomes a greenlet and its writes block the hub again.
+
+# Ensure logs directory exists
+os.makedirs('logs', exist_ok=True)
+
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.FileHandler('logs/app.log'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)  # drain queued records on shutdown
 
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
 
-# METRICS COLLECTION - In-memory metrics (production would use Prometheus)
+# METRICS COLLECTION - Prometheus client metrics
+# Under Gunicorn, PROMETHEUS_MULTIPROC_DIR is set (gunicorn.conf.py) and every worker writes
+# its samples there, so /metrics and /status report totals for all workers, not just the one
+# that happened to answer the scrape.
 
-class Metrics:
-    def __init__(self):
-        self.total_requests = 0
-        self.total_errors = 0
-        self.endpoint_stats = {}
-        self.start_time = datetime.now()
-    
-    def record_request(self, endpoint, duration, status_code):
-        self.total_requests += 1
-        if status_code >= 400:
-            self.total_errors += 1
-        
-        if endpoint not in self.endpoint_stats:
-            self.endpoint_stats[endpoint] = {
-                'count': 0,
-                'total_duration': 0,
-                'errors': 0
-            }
-        
-        stats = self.endpoint_stats[endpoint]
-        stats['count'] += 1
-        stats['total_duration'] += duration
-        if status_code >= 400:
-            stats['errors'] += 1
-    
-    def get_stats(self):
-        uptime = (datetime.now() - self.start_time).total_seconds()
-        return {
-            'uptime_seconds': uptime,
-            'total_requests': self.total_requests,
-            'total_errors': self.total_errors,
-            'error_rate': self.total_errors / max(self.total_requests, 1),
-            'endpoints': {
-                ep: {
-                    'count': stats['count'],
-                    'avg_duration_ms': stats['total_duration'] / max(stats['count'], 1),
-                    'errors': stats['errors'],
-                    'error_rate': stats['errors'] / max(stats['count'], 1)
-                }
-                for ep, stats in self.endpoint_stats.items()
+registry = CollectorRegistry()
+
+REQUESTS = Counter(
+    'http_requests_total', 'Total number of HTTP requests',
+    ['endpoint', 'status'], registry=registry
+)
+LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request duration in seconds',
+    ['endpoint'], registry=registry
+)
+
+START_NS = time.monotonic_ns()
+# Callback gauges don't work across processes; export the start time and let
+# Prometheus compute uptime as time() - app_start_time_seconds
+START_TIME = Gauge(
+    'app_start_time_seconds', 'Unix time the oldest live worker started',
+    registry=registry, multiprocess_mode='livemin'
+)
+START_TIME.set(time.time())
+
+
+def _metrics_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return registry
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    return merged
+
+
+def get_stats():
+    """Summarize the Prometheus metrics for /status"""
+    endpoints = defaultdict(lambda: {'count': 0, 'errors': 0, 'duration_s': 0.0})
+    
+    for metric in _metrics_registry().collect():
+        for sample in metric.samples:
+            if metric.name == 'http_requests' and sample.name.endswith('_total'):
+                stats = endpoints[sample.labels['endpoint']]
+                stats['count'] += int(sample.value)
+                if int(sample.labels['status']) >= 400:
+                    stats['errors'] += int(sample.value)
+            elif metric.name == 'http_request_duration_seconds' and sample.name.endswith('_sum'):
+                endpoints[sample.labels['endpoint']]['duration_s'] += sample.value
+    
+    total_requests = sum(stats['count'] for stats in endpoints.values())
+    total_errors = sum(stats['errors'] for stats in endpoints.values())
+    return {
+        'uptime_seconds': (time.monotonic_ns() - START_NS) / 1e9,  # this worker
+        'total_requests': total_requests,
+        'total_errors': total_errors,
+        'error_rate': total_errors / max(total_requests, 1),
+        'endpoints': {
+            ep: {
+                'count': stats['count'],
+                'avg_duration_ms': stats['duration_s'] * 1000 / max(stats['count'], 1),
+                'errors': stats['errors'],
+                'error_rate': stats['errors'] / max(stats['count'], 1)
             }
+            for ep, stats in endpoints.items()
         }
+    }
 
 
-metrics = Metrics()
+# SEARCH CACHE - /rag/search is deterministic for (query, k, include_text)
+
+_search_cache = TTLCache(maxsize=2000, ttl=600)  # key -> serialized JSON body
+_search_cache_lock = threading.Lock()  # TTLCache is not thread-safe
+
+
+def _search_key(retriever, query, k, include_text):
+    # Versioned by the store this worker loaded, not whatever is on disk now
+    params = [retriever.store_version, query, k, include_text]
+    return hashlib.blake2b(orjson.dumps(params), digest_size=16).hexdigest()
+
+
+# TIMESTAMPS - Durations use time.monotonic_ns(); wall-clock strings are formatted once per second
+
+@lru_cache(maxsize=1)
+def _iso_for_second(second):
+    return datetime.fromtimestamp(second).isoformat()
+
+
+def _iso_now():
+    return _iso_for_second(int(time.time()))
 
 
 # FLASK APP SETUP
 
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+class ORJSONProvider(JSONProvider):
+    """jsonify()/request.get_json() backed by orjson (Rust, much faster than stdlib json)"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 
-# Ensure logs directory exists
-os.makedirs('logs', exist_ok=True)
+app = Flask(__name__)
+app.json = ORJSONProvider(app)
+# Admin routes are left out so browsers can't read their responses cross-origin
+CORS(app, resources={r"^/(?!admin/).*": {"origins": "*"}})
+
 
 
 # MIDDLEWARE - Request tracking and timing
 
 @app.before_request
 def before_request():
-    g.start_time = time.time()
-    g.request_id = str(uuid.uuid4())[:8]
+    g.start_ns = time.monotonic_ns()
+    g.request_id = secrets.token_hex(4)  # 8 hex chars
     
     logger.info(f"[{g.request_id}] {request.method} {request.path} - Request started")
 
 
 @app.after_request
 def after_request(response):
-    if hasattr(g, 'start_time'):
-        duration = (time.time() - g.start_time) * 1000  # Convert to ms
+    if hasattr(g, 'start_ns'):
+        start_ns = g.start_ns
+        request_id = g.request_id
+        method, path = request.method, request.path
+        status_code = response.status_code
+        # Route template, not raw path, to keep label cardinality bounded
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
         
-        logger.info(
-            f"[{g.request_id}] {request.method} {request.path} - "
-            f"Status: {response.status_code} - Duration: {duration:.2f}ms"
-        )
+        def record():
+            duration = (time.monotonic_ns() - start_ns) / 1e6  # Convert to ms
+            
+            logger.info(
+                f"[{request_id}] {method} {path} - "
+                f"Status: {status_code} - Duration: {duration:.2f}ms"
+            )
+            
+            # Record metrics
+            REQUESTS.labels(endpoint, status_code).inc()
+            LATENCY.labels(endpoint).observe(duration / 1000)
+            return duration
         
-        # Record metrics
-        metrics.record_request(request.path, duration, response.status_code)
+        if response.is_streamed:
+            # The body hasn't been sent yet: log and record the full duration once the
+            # stream closes. X-Response-Time is then only the time to first byte.
+            response.call_on_close(record)
+            duration = (time.monotonic_ns() - start_ns) / 1e6
+        else:
+            duration = record()
         
         # Add headers for observability
-        response.headers['X-Request-ID'] = g.request_id
+        response.headers['X-Request-ID'] = request_id
         response.headers['X-Response-Time'] = f"{duration:.2f}ms"
     
     return response
 
 
-
 # ERROR HANDLERS
 
 @app.errorhandler(Exception)
@@ -141,7 +235,6 @@ def handle_exc(e):
     }), 500
 
 
-
 # ROOT ENDPOINT - Minimal API Landing Route
 
 @app.route('/')
@@ -153,11 +246,14 @@ def index():
             "/status",
             "/metrics",
             "/rag/answer",
-            "/rag/search"
+            "/rag/answer/stream",
+            "/rag/search",
+            "/admin/clear-cache"
         ]
     })
 
 
+
 # HEALTH & MONITORING ENDPOINTS
 
 @app.get("/health")
@@ -165,7 +261,7 @@ def health():
     """Basic health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": _iso_now()
     })
 
 
@@ -174,34 +270,17 @@ def status():
     """Detailed status with system information"""
     return jsonify({
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _iso_now(),
         "version": "1.0.0",
         "environment": os.getenv("FLASK_ENV", "production"),
-        "metrics": metrics.get_stats()
+        "metrics": get_stats()
     })
 
 
 @app.get("/metrics")
 def metrics_endpoint():
-    """Prometheus-style metrics endpoint"""
-    stats = metrics.get_stats()
-    
-    # Simple text format (real Prometheus would use proper format)
-    lines = [
-        f"# HELP http_requests_total Total number of HTTP requests",
-        f"# TYPE http_requests_total counter",
-        f"http_requests_total {stats['total_requests']}",
-        f"",
-        f"# HELP http_errors_total Total number of HTTP errors",
-        f"# TYPE http_errors_total counter",
-        f"http_errors_total {stats['total_errors']}",
-        f"",
-        f"# HELP app_uptime_seconds Application uptime in seconds",
-        f"# TYPE app_uptime_seconds gauge",
-        f"app_uptime_seconds {stats['uptime_seconds']:.2f}",
-    ]
-    
-    return "\n".join(lines), 200, {'Content-Type': 'text/plain'}
+    """Prometheus metrics endpoint (text exposition format)"""
+    return generate_latest(_metrics_registry()), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
 
 # RAG ENDPOINTS - Enhanced with detailed logging
@@ -221,14 +300,18 @@ def rag_api():
         logger.warning(f"[{request_id}] Missing query parameter")
         return jsonify({"error": "Missing 'query'"}), 400
     
+    if k < 1:
+        logger.warning(f"[{request_id}] Invalid k: {k}")
+        return jsonify({"error": "'k' must be >= 1"}), 400
+    
     # Log the request details
     logger.info(f"[{request_id}] RAG Query: '{query[:100]}...' (k={k}, provider={provider})")
     
     try:
         # Time the RAG processing
-        rag_start = time.time()
+        rag_start = time.monotonic_ns()
         result = rag_answer(query, k=k, provider=provider)
-        rag_duration = (time.time() - rag_start) * 1000
+        rag_duration = (time.monotonic_ns() - rag_start) / 1e6
         
         logger.info(f"[{request_id}] RAG processing completed in {rag_duration:.2f}ms")
         
@@ -244,261 +327,9 @@ def rag_api():
         raise
 
 
-@app.post("/rag/search")
-def rag_search():
-    """Search endpoint - retrieves relevant context chunks"""
-    request_id = g.request_id
-    
-    # Parse and validate input
-    data = request.get_json(force=True, silent=False) or {}
-    query = data.get("query", "")
-    k = int(data.get("k", 4))
-    include_text = bool(data.get("include_text", False))
-    
-    if not query:
-        logger.warning(f"[{request_id}] Missing query parameter")
-        return jsonify({"error": "Missing 'query'"}), 400
-    
-    logger.info(f"[{request_id}] Search Query: '{query[:100]}...' (k={k})")
-    
-    try:
-        # Time the retrieval
-        retrieval_start = time.time()
-        ctxs = get_retriever().search(query, k=k)
-        retrieval_duration = (time.time() - retrieval_start) * 1000
-        
-        logger.info(
-            f"[{request_id}] Retrieved {len(ctxs)} chunks in {retrieval_duration:.2f}ms"
-        )
-        
-        if include_text:
-            return jsonify(ctxs)
-        
-        # Hide chunk text in default response
-        return jsonify([{k:v for k,v in c.items() if k != "text"} for c in ctxs])
-    
-    except Exception as e:
-        logger.error(f"[{request_id}] Search failed: {str(e)}", exc_info=True)
-        raise
-
-
-# MAIN
-
-if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))
-    logger.info(f"Starting Flask server on port {port}")
-    app.run(host="0.0.0.0", port=port, debug=True)
-# app/api_flask.py - Enhanced with Logging & Observability
-from dotenv import load_dotenv
-load_dotenv()
-
-
-import os
-import time
-import uuid
-import logging
-from datetime import datetime
-from flask import Flask, jsonify, request, g
-from flask_cors import CORS
-from werkzeug.exceptions import HTTPException
-from rag.rag import answer as rag_answer
-from rag.rag import get_retriever
-
-
-# LOGGING SETUP - Structured logging with JSON format
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
-
-
-# METRICS COLLECTION - In-memory metrics (production would use Prometheus)
-
-class Metrics:
-    def __init__(self):
-        self.total_requests = 0
-        self.total_errors = 0
-        self.endpoint_stats = {}
-        self.start_time = datetime.now()
-    
-    def record_request(self, endpoint, duration, status_code):
-        self.total_requests += 1
-        if status_code >= 400:
-            self.total_errors += 1
-        
-        if endpoint not in self.endpoint_stats:
-            self.endpoint_stats[endpoint] = {
-                'count': 0,
-                'total_duration': 0,
-                'errors': 0
-            }
-        
-        stats = self.endpoint_stats[endpoint]
-        stats['count'] += 1
-        stats['total_duration'] += duration
-        if status_code >= 400:
-            stats['errors'] += 1
-    
-    def get_stats(self):
-        uptime = (datetime.now() - self.start_time).total_seconds()
-        return {
-            'uptime_seconds': uptime,
-            'total_requests': self.total_requests,
-            'total_errors': self.total_errors,
-            'error_rate': self.total_errors / max(self.total_requests, 1),
-            'endpoints': {
-                ep: {
-                    'count': stats['count'],
-                    'avg_duration_ms': stats['total_duration'] / max(stats['count'], 1),
-                    'errors': stats['errors'],
-                    'error_rate': stats['errors'] / max(stats['count'], 1)
-                }
-                for ep, stats in self.endpoint_stats.items()
-            }
-        }
-
-
-metrics = Metrics()
-
-
-# FLASK APP SETUP
-
-app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
-
-
-# Ensure logs directory exists
-os.makedirs('logs', exist_ok=True)
-
-
-
-# MIDDLEWARE - Request tracking and timing
-
-@app.before_request
-def before_request():
-    g.start_time = time.time()
-    g.request_id = str(uuid.uuid4())[:8]
-    
-    logger.info(f"[{g.request_id}] {request.method} {request.path} - Request started")
-
-
-@app.after_request
-def after_request(response):
-    if hasattr(g, 'start_time'):
-        duration = (time.time() - g.start_time) * 1000  # Convert to ms
-        
-        logger.info(
-            f"[{g.request_id}] {request.method} {request.path} - "
-            f"Status: {response.status_code} - Duration: {duration:.2f}ms"
-        )
-        
-        # Record metrics
-        metrics.record_request(request.path, duration, response.status_code)
-        
-        # Add headers for observability
-        response.headers['X-Request-ID'] = g.request_id
-        response.headers['X-Response-Time'] = f"{duration:.2f}ms"
-    
-    return response
-
-
-# ERROR HANDLERS
-
-@app.errorhandler(Exception)
-def handle_exc(e):
-    request_id = getattr(g, 'request_id', 'unknown')
-    
-    if isinstance(e, HTTPException):
-        logger.warning(f"[{request_id}] HTTP Exception: {e.code} - {e.description}")
-        return jsonify({
-            "error": e.description,
-            "request_id": request_id
-        }), e.code
-    
-    # Log full stack trace for unexpected errors
-    logger.error(f"[{request_id}] Unhandled exception: {type(e).__name__}", exc_info=True)
-    
-    return jsonify({
-        "error": str(e),
-        "kind": type(e).__name__,
-        "request_id": request_id
-    }), 500
-
-
-# ROOT ENDPOINT - Minimal API Landing Route
-
-@app.route('/')
-def index():
-    return jsonify({
-        "message": "API is running",
-        "available_endpoints": [
-            "/health",
-            "/status",
-            "/metrics",
-            "/rag/answer",
-            "/rag/search"
-        ]
-    })
-
-
-
-# HEALTH & MONITORING ENDPOINTS
-
-@app.get("/health")
-def health():
-    """Basic health check endpoint"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat()
-    })
-
-
-@app.get("/status")
-def status():
-    """Detailed status with system information"""
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0",
-        "environment": os.getenv("FLASK_ENV", "production"),
-        "metrics": metrics.get_stats()
-    })
-
-
-@app.get("/metrics")
-def metrics_endpoint():
-    """Prometheus-style metrics endpoint"""
-    stats = metrics.get_stats()
-    
-    # Simple text format (real Prometheus would use proper format)
-    lines = [
-        f"# HELP http_requests_total Total number of HTTP requests",
-        f"# TYPE http_requests_total counter",
-        f"http_requests_total {stats['total_requests']}",
-        f"",
-        f"# HELP http_errors_total Total number of HTTP errors",
-        f"# TYPE http_errors_total counter",
-        f"http_errors_total {stats['total_errors']}",
-        f"",
-        f"# HELP app_uptime_seconds Application uptime in seconds",
-        f"# TYPE app_uptime_seconds gauge",
-        f"app_uptime_seconds {stats['uptime_seconds']:.2f}",
-    ]
-    
-    return "\n".join(lines), 200, {'Content-Type': 'text/plain'}
-
-
-# RAG ENDPOINTS - Enhanced with detailed logging
-
-@app.post("/rag/answer")
-def rag_api():
-    """Main RAG endpoint - retrieves context and generates answer"""
+@app.post("/rag/answer/stream")
+def rag_stream_api():
+    """Streaming RAG endpoint - sends contexts, then the answer as server-sent events"""
     request_id = g.request_id
     
     # Parse and validate input
@@ -511,27 +342,37 @@ def rag_api():
         logger.warning(f"[{request_id}] Missing query parameter")
         return jsonify({"error": "Missing 'query'"}), 400
     
-    # Log the request details
-    logger.info(f"[{request_id}] RAG Query: '{query[:100]}...' (k={k}, provider={provider})")
-    
-    try:
-        # Time the RAG processing
-        rag_start = time.time()
-        result = rag_answer(query, k=k, provider=provider)
-        rag_duration = (time.time() - rag_start) * 1000
-        
-        logger.info(f"[{request_id}] RAG processing completed in {rag_duration:.2f}ms")
+    if k < 1:
+        logger.warning(f"[{request_id}] Invalid k: {k}")
+        return jsonify({"error": "'k' must be >= 1"}), 400
+    
+    logger.info(f"[{request_id}] RAG Stream Query: '{query[:100]}...' (k={k}, provider={provider})")
+    
+    # Retrieval happens here, so its failures still get a normal error response
+    rag_start = time.monotonic_ns()
+    events = rag_answer_stream(query, k=k, provider=provider)
+    
+    def generate():
+        try:
+            for i, event in enumerate(events):
+                if i == 0:
+                    event['meta']['request_id'] = request_id
+                yield f"data: {app.json.dumps(event)}\n\n"
+            yield "data: [DONE]\n\n"
+            
+            rag_duration = (time.monotonic_ns() - rag_start) / 1e6
+            logger.info(f"[{request_id}] RAG stream completed in {rag_duration:.2f}ms")
         
-        # Add metadata to response
-        result['meta'] = result.get('meta', {})
-        result['meta']['request_id'] = request_id
-        result['meta']['processing_time_ms'] = rag_duration
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"[{request_id}] RAG stream failed: {str(e)}", exc_info=True)
+            yield f"data: {app.json.dumps({'error': str(e), 'kind': type(e).__name__, 'request_id': request_id})}\n\n"
         
-        return jsonify(result)
+        finally:
+            events.close()  # also closes the Azure stream if the client went away
     
-    except Exception as e:
-        logger.error(f"[{request_id}] RAG processing failed: {str(e)}", exc_info=True)
-        raise
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={'Cache-Control': 'no-cache'})
 
 
 @app.post("/rag/search")
@@ -549,32 +390,86 @@ def rag_search():
         logger.warning(f"[{request_id}] Missing query parameter")
         return jsonify({"error": "Missing 'query'"}), 400
     
+    if k < 1:
+        logger.warning(f"[{request_id}] Invalid k: {k}")
+        return jsonify({"error": "'k' must be >= 1"}), 400
+    
     logger.info(f"[{request_id}] Search Query: '{query[:100]}...' (k={k})")
     
+    # Same params and corpus -> same result, so the cache key doubles as the ETag.
+    # This is a POST endpoint: browsers never send If-None-Match here, so this
+    # conditional path only serves API clients that echo the ETag back themselves.
+    retriever = get_retriever()
+    k = min(k, retriever.index.ntotal)  # same result as search() would give, same key
+    key = _search_key(retriever, query, k, include_text)
+    # Explicit match only: contains() would also accept "If-None-Match: *"
+    if request.if_none_match.is_strong(key) or request.if_none_match.is_weak(key):
+        logger.info(f"[{request_id}] Search not modified (ETag match)")
+        return Response(status=304, headers={'ETag': f'"{key}"'})
+    
     try:
-        # Time the retrieval
-        retrieval_start = time.time()
-        ctxs = get_retriever().search(query, k=k)
-        retrieval_duration = (time.time() - retrieval_start) * 1000
-        
-        logger.info(
-            f"[{request_id}] Retrieved {len(ctxs)} chunks in {retrieval_duration:.2f}ms"
-        )
+        with _search_cache_lock:
+            body = _search_cache.get(key)
         
-        if include_text:
-            return jsonify(ctxs)
+        if body is not None:
+            logger.info(f"[{request_id}] Search served from cache")
+        else:
+            # Time the retrieval
+            retrieval_start = time.monotonic_ns()
+            ctxs = retriever.search(query, k=k)
+            retrieval_duration = (time.monotonic_ns() - retrieval_start) / 1e6
+            
+            logger.info(
+                f"[{request_id}] Retrieved {len(ctxs)} chunks in {retrieval_duration:.2f}ms"
+            )
+            
+            # Hide chunk text in default response
+            if not include_text:
+                ctxs = strip_text(ctxs)
+            
+            body = orjson.dumps(ctxs)
+            with _search_cache_lock:
+                _search_cache[key] = body
         
-        # Hide chunk text in default response
-        return jsonify([{k:v for k,v in c.items() if k != "text"} for c in ctxs])
+        response = Response(body, mimetype='application/json')
+        response.set_etag(key)
+        return response
     
     except Exception as e:
         logger.error(f"[{request_id}] Search failed: {str(e)}", exc_info=True)
         raise
 
 
+# ADMIN ENDPOINTS - require "Authorization: Bearer $ADMIN_TOKEN"; disabled when ADMIN_TOKEN is unset
+
+def _require_admin():
+    token = os.getenv("ADMIN_TOKEN", "")
+    if not token:
+        abort(403, description="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        logger.warning(f"[{g.request_id}] Rejected admin request to {request.path}")
+        abort(401, description="Invalid or missing admin token")
+
+
+@app.post("/admin/clear-cache")
+def clear_cache():
+    """Drop cached query embeddings and this worker's search results"""
+    _require_admin()
+    request_id = g.request_id
+    get_retriever().clear_cache()
+    # Per-process: other Gunicorn workers keep their search results until the TTL expires.
+    # Their ETags stay valid either way, since results only change with the loaded store.
+    with _search_cache_lock:
+        _search_cache.clear()
+    logger.info(f"[{request_id}] Query embedding and search caches cleared")
+    return jsonify({"status": "cleared", "request_id": request_id})
+
+
 # MAIN
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     logger.info(f"Starting Flask server on port {port}")
-    app.run(host="0.0.0.0", port=port, debug=True)
+    app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,48 @@
+# gunicorn.conf.py - Production server settings
+# Run with: gunicorn -c gunicorn.conf.py wsgi
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+
+# Every worker loads its own copy of the embedding model (~500MB), so keep this small;
+# concurrency comes from threads, not processes
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+
+# Threaded workers: torch releases the GIL during encode and requests waiting on
+# Azure only hold their own thread, so neither stalls the rest of the worker
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+keepalive = 30
+
+# LLM calls can take a while
+timeout = 120
+
+accesslog = "-"
+
+# Workers share Prometheus metrics through files here (see app/api_flask.py).
+# Must be set before the app imports prometheus_client.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "discordchatbot-prometheus"),
+)
+
+
+def on_starting(server):
+    # Start the counters from zero instead of adding to the last run's files
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def post_fork(server, worker):
+    # Split the cores between workers instead of every torch pool claiming all of them
+    import torch
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // server.cfg.workers))
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters stay in the totals
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,30 @@
+# rag/embed_model.py
+"""
+Process-wide SentenceTransformer shared by ingest and retrieval.
+"""
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+EMB_MODEL = "intfloat/e5-base-v2"
+
+_model = None
+_lock = threading.Lock()
+
+def get_embedder() -> "SentenceTransformer":
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                # Imported on first use: importing this module (e.g. for EMB_MODEL,
+                # or in spawned ingest workers) shouldn't pull in torch
+                import torch
+                from sentence_transformers import SentenceTransformer
+                device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+                model = SentenceTransformer(EMB_MODEL, device=str(device))
+                if device.type == "cuda":
+                    model.half()  # FP16 inference on GPU
+                _model = model
+    return _model
@@ -1,9 +1,13 @@
 # rag/generate.py
-import os, re
+import os, re, threading
 from textwrap import dedent
-from typing import List, Dict
+from typing import List, Dict, Iterator
+import httpx
 from openai import OpenAI  # pip install openai>=1.51.0
 
+# DeepSeek <think> blocks, compiled once at import
+_THINK_RE = re.compile(r"<think>.*?</think>\s*", re.DOTALL)
+
 def _make_prompt(query: str, contexts: List[Dict]) -> str:
     ctx = "\n\n".join([f"[{i+1}] {c.get('text','')}" for i, c in enumerate(contexts)])
     return dedent(f"""
@@ -21,19 +25,100 @@ def _make_prompt(query: str, contexts: List[Dict]) -> str:
 
 def _strip_think(text: str) -> str:
     # Remove DeepSeek <think> blocks from output
-    return re.sub(r"<think>.*?</think>\s*", "", text, flags=re.DOTALL)
+    return _THINK_RE.sub("", text)
 
-def _azure_foundry_call(prompt: str) -> str:
+_client = None
+_client_lock = threading.Lock()
+
+def _client_config() -> Dict:
     # .env:
     # AZURE_OPENAI_ENDPOINT=https://aifoundary-rag.services.ai.azure.com/
     # AZURE_OPENAI_API_KEY=...
     # AZURE_OPENAI_API_VERSION=2024-05-01-preview  (not used by SDK call, kept for reference)
-    # AZURE_OPENAI_MODEL=DeepSeek-R1               (DEPLOYMENT name)
     base = os.environ["AZURE_OPENAI_ENDPOINT"].rstrip("/")
     key  = os.environ["AZURE_OPENAI_API_KEY"]
+    return {"base_url": f"{base}/openai/v1", "api_key": key}
+
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20)
+
+def _get_client() -> OpenAI:
+    # One client per process so the HTTP/2 connection pool (and TLS sessions)
+    # to Azure are reused across requests. A sync client is enough: with the
+    # threaded workers (gunicorn.conf.py) a call waiting on Azure holds one thread.
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(
+                    **_client_config(),
+                    http_client=httpx.Client(http2=True, limits=_HTTP_LIMITS),
+                )
+    return _client
+
+class _ThinkStripper:
+    """
+    Incremental _strip_think(text.strip()) for streamed output, where tags can be split
+    across chunks. The output matches the non-streaming path exactly: trailing whitespace
+    is held back until more text follows, and a <think> block that never closes is kept
+    and released verbatim by flush(), as the regex would leave it.
+    """
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self._buf = ""          # raw text not yet emitted or discarded
+        self._in_think = False
+        self._skip_ws = True    # leading whitespace, and whitespace after </think>
+        self._scan = 0          # inside a think block: where to resume looking for CLOSE
+
+    @staticmethod
+    def _partial_tag(text: str, tag: str) -> int:
+        # Length of the longest suffix of text that could be the start of tag
+        for n in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:n]):
+                return n
+        return 0
+
+    def feed(self, text: str) -> str:
+        self._buf += text
+        out = []
+        while self._buf:
+            if self._in_think:
+                j = self._buf.find(self.CLOSE, self._scan)
+                if j < 0:
+                    self._scan = max(len(self._buf) - len(self.CLOSE) + 1, 0)
+                    break
+                self._buf = self._buf[j + len(self.CLOSE):]
+                self._in_think, self._skip_ws, self._scan = False, True, 0
+                continue
+            if self._skip_ws:
+                self._buf = self._buf.lstrip()
+                if not self._buf:
+                    break
+                self._skip_ws = False
+            i = self._buf.find(self.OPEN)
+            if i >= 0:
+                out.append(self._buf[:i])
+                self._buf = self._buf[i:]  # keep the tag in case the block never closes
+                self._in_think, self._scan = True, len(self.OPEN)
+                continue
+            keep = self._partial_tag(self._buf, self.OPEN)
+            if not keep:
+                keep = len(self._buf) - len(self._buf.rstrip())  # may be the end of the answer
+            out.append(self._buf[:len(self._buf) - keep])
+            self._buf = self._buf[len(self._buf) - keep:]
+            break
+        return "".join(out)
+
+    def flush(self) -> str:
+        rest = self._buf.rstrip()
+        self._buf = ""
+        return rest
+
+def _azure_foundry_call(prompt: str) -> str:
+    # AZURE_OPENAI_MODEL=DeepSeek-R1  (DEPLOYMENT name)
     deployment = os.environ.get("AZURE_OPENAI_MODEL", "DeepSeek-R1")
 
-    client = OpenAI(base_url=f"{base}/openai/v1", api_key=key)
+    client = _get_client()
     resp = client.chat.completions.create(
         model=deployment,  # deployment name from AI Foundry → Deployments
         messages=[{"role": "user", "content": prompt}],
@@ -41,6 +126,33 @@ def _azure_foundry_call(prompt: str) -> str:
     )
     return _strip_think(resp.choices[0].message.content.strip())
 
+def _azure_foundry_stream(prompt: str) -> Iterator[str]:
+    deployment = os.environ.get("AZURE_OPENAI_MODEL", "DeepSeek-R1")
+
+    client = _get_client()
+    stripper = _ThinkStripper()
+    # Closing this generator (client disconnect) exits the with-block, which closes
+    # the HTTP stream and releases its pooled connection instead of waiting for GC.
+    with client.chat.completions.create(
+        model=deployment,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.2,
+        stream=True,
+    ) as resp:
+        for chunk in resp:
+            if not chunk.choices:
+                continue  # e.g. Azure content-filter preamble
+            text = stripper.feed(chunk.choices[0].delta.content or "")
+            if text:
+                yield text
+    rest = stripper.flush()
+    if rest:
+        yield rest
+
 def generate_answer(query: str, contexts: List[Dict], provider: str = "azure") -> str:
     prompt = _make_prompt(query, contexts)
     return _azure_foundry_call(prompt)
+
+def generate_answer_stream(query: str, contexts: List[Dict], provider: str = "azure") -> Iterator[str]:
+    prompt = _make_prompt(query, contexts)
+    return _azure_foundry_stream(prompt)
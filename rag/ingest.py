@@ -1,58 +1,59 @@
 # rag/ingest.py
-import os, json, uuid
+import os
+import orjson
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from rag.embed_model import EMB_MODEL, get_embedder
+from rag.readers import parse_one
 import tiktoken
-from pypdf import PdfReader
-from docx import Document
 
 ENC = tiktoken.get_encoding("cl100k_base")
 DATA_DIR = Path("data")
 STORE_DIR = Path("store")
-EMB_MODEL = "intfloat/e5-base-v2"
 
-def read_txt(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
-
-def read_pdf(p: Path) -> str:
-    reader = PdfReader(str(p))
-    return "\n".join([(pg.extract_text() or "") for pg in reader.pages])
-
-def read_docx(p: Path) -> str:
-    doc = Document(str(p))
-    return "\n".join([para.text for para in doc.paragraphs])
+# Below this many files, worker start-up costs more than the parsing it saves
+PARALLEL_MIN_FILES = 8
 
 def load_docs():
-    docs = []
+    paths = []
     for p in DATA_DIR.glob("**/*"):
         if p.suffix.lower() in [".txt", ".pdf", ".docx", ".md"]:
             if p.name.startswith("Discord RAG FAQ Chatbot"):
                 continue  # skip meta doc
-            if p.suffix.lower()==".pdf":
-                text = read_pdf(p)
-            elif p.suffix.lower()==".docx":
-                text = read_docx(p)
-            else:
-                text = read_txt(p)
-            if text.strip():
-                docs.append({"id": str(uuid.uuid4()), "path": str(p), "text": text})
-    return docs
+            paths.append(p)
+    if len(paths) < PARALLEL_MIN_FILES:
+        docs = [parse_one(p) for p in paths]
+    else:
+        # Text extraction is CPU-bound and independent per file
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(paths))) as ex:
+            docs = list(ex.map(parse_one, paths))
+    return [d for d in docs if d is not None]
+
+def chunk_batch(texts, max_tokens=400, overlap=60):
+    # Tokenize all docs and decode all windows in one tiktoken call each
+    # (both run multi-threaded in Rust), instead of a decode per chunk.
+    stride = max_tokens - overlap
+    windows, counts = [], []
+    for toks in ENC.encode_batch(texts):
+        starts = range(0, max(len(toks) - overlap, 1), stride) if toks else []
+        windows.extend(toks[s:s+max_tokens] for s in starts)
+        counts.append(len(starts))
+    pieces = ENC.decode_batch(windows)
+    out, i = [], 0
+    for n in counts:
+        out.append(pieces[i:i+n])
+        i += n
+    return out
 
 def chunk(text: str, max_tokens=400, overlap=60):
-    toks = ENC.encode(text)
-    i, chunks = 0, []
-    while i < len(toks):
-        piece = toks[i:i+max_tokens]
-        chunks.append(ENC.decode(piece))
-        i += max_tokens - overlap
-    return chunks
+    return chunk_batch([text], max_tokens=max_tokens, overlap=overlap)[0]
 
 def main():
     docs = load_docs()
     all_chunks = []
-    for d in docs:
-        for i, ch in enumerate(chunk(d["text"])):
+    for d, pieces in zip(docs, chunk_batch([d["text"] for d in docs])):
+        for i, ch in enumerate(pieces):
             all_chunks.append({
                 "doc_id": d["id"],
                 "source": d["path"],
@@ -62,20 +63,30 @@ def main():
     if not all_chunks:
         raise SystemExit("No docs found in ./data. Put your 3 files there (.docx/.pdf).")
 
+    import faiss  # imported here so spawned parse workers re-importing this module skip it
+
     STORE_DIR.mkdir(exist_ok=True)
-    model = SentenceTransformer(EMB_MODEL)
+    model = get_embedder()  # on CUDA in FP16 when available
     texts = [c["text"] for c in all_chunks]
-    embs = model.encode(texts, normalize_embeddings=False, batch_size=32)
-    np.save(STORE_DIR / "embeddings.npy", embs)
+    embs = model.encode(texts, batch_size=256, normalize_embeddings=True,
+                        convert_to_numpy=True, show_progress_bar=True).astype("float32")
+    np.save(STORE_DIR / "embeddings.npy", embs.astype(np.float16), allow_pickle=False)
+
+    # Unit-norm vectors, so inner product is cosine similarity. 8-bit scalar
+    # quantization cuts index memory (and bandwidth per query) 4x vs FP32.
+    # For >100k chunks switch to IndexHNSWFlat / IndexIVFPQ.
+    index = faiss.IndexScalarQuantizer(embs.shape[1], faiss.ScalarQuantizer.QT_8bit,
+                                       faiss.METRIC_INNER_PRODUCT)
+    index.train(embs)
+    index.add(embs)
+    faiss.write_index(index, str(STORE_DIR / "faiss.index"))
 
-    with open(STORE_DIR / "chunks.jsonl", "w", encoding="utf-8") as f:
-        for c in all_chunks:
-            f.write(json.dumps(c, ensure_ascii=False) + "\n")
+    # One orjson call for the whole list; Retriever loads it back in one call too
+    (STORE_DIR / "chunks.json").write_bytes(orjson.dumps(all_chunks))
 
-    with open(STORE_DIR / "meta.json", "w") as f:
-        json.dump({"model": EMB_MODEL, "count": len(all_chunks)}, f)
+    (STORE_DIR / "meta.json").write_bytes(orjson.dumps({"model": EMB_MODEL, "count": len(all_chunks)}))
 
-    print(f"Saved {len(all_chunks)} chunks and embeddings → store/")
+    print(f"Saved {len(all_chunks)} chunks, embeddings and FAISS index → store/")
 
 if __name__ == "__main__":
     main()
@@ -2,34 +2,82 @@
 """
 RAG brain: retrieve → generate. Stable response shape.
 """
+import threading
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 from rag.retrieve import Retriever
-from rag.generate import generate_answer
+from rag.generate import generate_answer, generate_answer_stream
 
 _retriever = None
+_retriever_lock = threading.Lock()
 
-def _get_retriever():
+def get_retriever() -> Retriever:
     global _retriever
     if _retriever is None:
-        _retriever = Retriever()
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = Retriever()
     return _retriever
 
+NO_ANSWER = "I couldn’t find a reliable answer in the provided documents."
+
+def strip_text(contexts):
+    # Copy each context without its chunk text (dict copy + pop runs in C)
+    out = []
+    for c in contexts:
+        c = dict(c)
+        c.pop("text", None)
+        out.append(c)
+    return out
+
+def _meta(k: int, provider: str) -> Dict[str, Any]:
+    return {"k": k, "provider": provider, "generated_at": datetime.utcnow().isoformat()+"Z"}
+
+def _weak_evidence(contexts) -> bool:
+    return not contexts or float(contexts[0].get("score", 0.0)) < 0.55
+
 def answer(query: str, k: int = 4, provider: str = "azure") -> Dict[str, Any]:
-    retriever = _get_retriever()
+    retriever = get_retriever()
     contexts = retriever.search(query, k=k)
 
     # Guardrail: if evidence too weak, don't guess
-    if not contexts or float(contexts[0].get("score", 0.0)) < 0.55:
-        return {
-            "answer": "I couldn’t find a reliable answer in the provided documents.",
-            "contexts": [{k:v for k,v in c.items() if k != "text"} for c in contexts],
-            "meta": {"k": k, "provider": provider, "generated_at": datetime.utcnow().isoformat()+"Z"}
-        }
-
-    text = generate_answer(query, contexts, provider=provider)
+    if _weak_evidence(contexts):
+        text = NO_ANSWER
+    else:
+        text = generate_answer(query, contexts, provider=provider)
     return {
         "answer": text,
-        "contexts": [{k:v for k,v in c.items() if k != "text"} for c in contexts],
-        "meta": {"k": k, "provider": provider, "generated_at": datetime.utcnow().isoformat()+"Z"}
-    }
\ No newline at end of file
+        "contexts": strip_text(contexts),
+        "meta": _meta(k, provider)
+    }
+
+def answer_stream(query: str, k: int = 4, provider: str = "azure") -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of answer(). Retrieval runs up front; the returned iterator
+    yields one {"contexts", "meta"} event, then {"delta": text} events as the answer arrives.
+    """
+    retriever = get_retriever()
+    contexts = retriever.search(query, k=k)
+    head = {
+        "contexts": strip_text(contexts),
+        "meta": _meta(k, provider)
+    }
+
+    # Guardrail: if evidence too weak, don't guess
+    if _weak_evidence(contexts):
+        return _stream_events(head, iter([NO_ANSWER]))
+
+    deltas = generate_answer_stream(query, contexts, provider=provider)
+    return _stream_events(head, deltas)
+
+def _stream_events(head: Dict[str, Any], deltas: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    # A generator rather than itertools.chain, so closing it (client disconnect)
+    # also closes the upstream LLM stream.
+    try:
+        yield head
+        for d in deltas:
+            yield {"delta": d}
+    finally:
+        close = getattr(deltas, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,34 @@
+# rag/readers.py
+"""
+Document text extraction for ingest. Kept free of the embedding stack
+(torch, sentence-transformers, faiss) so parse worker processes start fast.
+"""
+import uuid
+from pathlib import Path
+import pypdfium2 as pdfium
+from docx import Document
+
+def read_txt(p: Path) -> str:
+    return p.read_text(encoding="utf-8", errors="ignore")
+
+def read_pdf(p: Path) -> str:
+    pdf = pdfium.PdfDocument(str(p))
+    try:
+        return "\n".join([pg.get_textpage().get_text_range() for pg in pdf])
+    finally:
+        pdf.close()
+
+def read_docx(p: Path) -> str:
+    doc = Document(str(p))
+    return "\n".join([para.text for para in doc.paragraphs])
+
+def parse_one(p: Path):
+    if p.suffix.lower()==".pdf":
+        text = read_pdf(p)
+    elif p.suffix.lower()==".docx":
+        text = read_docx(p)
+    else:
+        text = read_txt(p)
+    if text.strip():
+        return {"id": str(uuid.uuid4()), "path": str(p), "text": text}
+    return None
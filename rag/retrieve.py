@@ -1,28 +1,62 @@
 # rag/retrieve.py
-import json, os
+import os
+import orjson
+from functools import lru_cache
 import numpy as np
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from sklearn.neighbors import NearestNeighbors
+import faiss
+from diskcache import Cache
+from rag.embed_model import EMB_MODEL, get_embedder
 
 STORE_DIR = Path("store")
-EMB_MODEL = "intfloat/e5-base-v2"
 
 class Retriever:
     def __init__(self):
-        self.model = SentenceTransformer(EMB_MODEL)
-        self.chunks = [json.loads(l) for l in open(STORE_DIR/"chunks.jsonl", encoding="utf-8")]
-        self.embs = np.load(STORE_DIR/"embeddings.npy")
-        self.nn = NearestNeighbors(n_neighbors=10, metric="cosine")
-        self.nn.fit(self.embs)
+        self.model = get_embedder()
+        self.chunks = orjson.loads((STORE_DIR/"chunks.json").read_bytes())
+        # Inner product over unit-norm vectors == cosine similarity
+        self.index = faiss.read_index(str(STORE_DIR/"faiss.index"))
+        if self.index.ntotal != len(self.chunks):
+            raise RuntimeError(
+                f"store/ is inconsistent: faiss.index has {self.index.ntotal} vectors but "
+                f"chunks.json has {len(self.chunks)} chunks. Re-run: python -m rag.ingest"
+            )
+        # ingest rewrites meta.json last, so its mtime identifies the corpus loaded here
+        try:
+            self.store_version = os.stat(STORE_DIR/"meta.json").st_mtime_ns
+        except FileNotFoundError:
+            self.store_version = 0
+        # Query embedding caches: in-memory LRU in front of an on-disk cache
+        # so repeat questions skip the transformer, even across restarts.
+        self.query_cache = Cache(str(STORE_DIR/"query_cache"))
+        self._encode_cached = lru_cache(maxsize=2048)(self._encode)
+
+    def _encode(self, text: str) -> bytes:
+        key = f"{EMB_MODEL}::{text}"
+        raw = self.query_cache.get(key)
+        if raw is None:
+            emb = self.model.encode([text], normalize_embeddings=True)[0]
+            raw = emb.astype(np.float32).tobytes()
+            self.query_cache.set(key, raw)
+        return raw
+
+    def clear_cache(self):
+        self._encode_cached.cache_clear()
+        self.query_cache.clear()
 
     def search(self, query: str, k: int = 5):
-        q = self.model.encode([query])
-        dist, idx = self.nn.kneighbors(q, n_neighbors=k)
+        # FAISS allocates k results up front and asserts on k <= 0
+        k = min(k, self.index.ntotal)
+        if k < 1:
+            return []
+        q = np.frombuffer(self._encode_cached(query), dtype=np.float32).reshape(1, -1)
+        scores, idx = self.index.search(q, k)
         out = []
-        for d, i in zip(dist[0], idx[0]):
+        for s, i in zip(scores[0], idx[0]):
+            if i < 0:
+                continue  # fewer than k chunks in the index
             c = self.chunks[int(i)]
-            score = float(1.0 - d)  # cosine similarity
+            score = float(s)  # cosine similarity
             title = os.path.basename(c.get("source",""))
             out.append({
                 "text": c["text"],
@@ -0,0 +1,4 @@
+# wsgi.py - WSGI entry point for production servers (gunicorn -c gunicorn.conf.py wsgi)
+from app.api_flask import app
+
+application = app